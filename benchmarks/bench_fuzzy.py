@@ -0,0 +1,62 @@
+import os
+import tempfile
+
+import jsonlines
+
+from benchmarks.common import make_keys, measure
+from gptrp.fuzzy_dict import FuzzyDict
+from gptrp.reverse_index import FuzzyReverseIndex
+
+_KEYS_PER_DOCUMENT = 3
+
+
+def bench_fuzzy_dict(size: int) -> list[dict]:
+    keys = make_keys(size)
+    fdict = FuzzyDict()
+    fdict._store = {key: i for i, key in enumerate(keys)}
+    hit = keys[len(keys) // 2]
+    return [
+        {"name": "FuzzyDict._find_key/hit", "size": size,
+         **measure(lambda: fdict._find_key(hit))},
+        {"name": "FuzzyDict._find_key/miss", "size": size,
+         **measure(lambda: fdict._find_key("no such key at all"))},
+    ]
+
+
+def _write_memories(filepath: str, keys: list[str]):
+    with jsonlines.open(filepath, mode='w') as writer:
+        for i in range(0, len(keys), _KEYS_PER_DOCUMENT):
+            writer.write({'keys': keys[i:i + _KEYS_PER_DOCUMENT],
+                         'value': f"Note number {i} about {keys[i]}."})
+
+
+def bench_reverse_index(size: int) -> list[dict]:
+    keys = make_keys(size)
+    with tempfile.TemporaryDirectory() as directory:
+        filepath = os.path.join(directory, "memories.jsonl")
+        _write_memories(filepath, keys)
+
+        results = [{"name": "FuzzyReverseIndex/load", "size": size,
+                    **measure(lambda: FuzzyReverseIndex(filepath))}]
+
+        terms = [keys[0], keys[len(keys) // 2], "no such key at all"]
+        # Loads a fresh index and runs its first query, which also prepares the keys for scoring.
+        results.append({"name": "FuzzyReverseIndex.query/cold", "size": size,
+                        **measure(lambda: FuzzyReverseIndex(filepath).query(terms[:1]))})
+
+        index = FuzzyReverseIndex(filepath)
+        results.append({"name": "FuzzyReverseIndex.query/1-term", "size": size,
+                        **measure(lambda: index.query(terms[:1]))})
+        results.append({"name": "FuzzyReverseIndex.query/3-terms", "size": size,
+                        **measure(lambda: index.query(terms))})
+        results.append({"name": "FuzzyReverseIndex.index_document", "size": size,
+                        **measure(lambda: index.index_document(["new key", "another new key"], "A new note."))})
+    return results
+
+
+def run(sizes: list[int]) -> list[dict]:
+    results = []
+    for size in sizes:
+        results.extend(bench_fuzzy_dict(size))
+        results.extend(bench_reverse_index(size))
+    return results
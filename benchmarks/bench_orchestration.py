@@ -0,0 +1,31 @@
+from types import SimpleNamespace
+
+from benchmarks.common import make_words, measure
+from gptrp.character_sheet import CharacterSheet
+from gptrp.game_master import GameMaster
+
+
+def _game_master(cast_size: int) -> GameMaster:
+    # Only the state read by sticky_prompt() is set up, constructing real agents would
+    # create context and memory files for every cast member.
+    names = make_words(cast_size, seed=1)
+    gm = GameMaster.__new__(GameMaster)
+    gm.hours_passed = 40.5
+    gm.setting = "The story takes place in a medieval fantasy world where magic exists and only a few are able to use it."
+    gm.pc_cs = CharacterSheet("Emi", "At the main gate of the castle.", "Young knight.")
+    gm.npcs = {}
+    for i, name in enumerate(names):
+        cs = CharacterSheet(f"{name} {i}", f"In room {i} of the castle.",
+                            "A resident of the castle with long standing loyalties and secrets. " * 3)
+        cs.inventory = ["a dagger", "a purse of coins", "a letter"]
+        gm.npcs[cs.full_name] = SimpleNamespace(cs=cs)
+    return gm
+
+
+def run(cast_sizes: list[int]) -> list[dict]:
+    results = []
+    for cast_size in cast_sizes:
+        gm = _game_master(cast_size)
+        results.append({"name": "GameMaster.sticky_prompt", "size": cast_size,
+                        **measure(gm.sticky_prompt, repeat=20)})
+    return results
@@ -0,0 +1,55 @@
+import os
+import tempfile
+import time
+
+from benchmarks.common import measure
+from gptrp.supervisor import SessionSupervisor
+
+# CPU time each completion takes in place of the API call, so the benchmark measures how
+# well the orchestration work spreads over the workers rather than network latency.
+_CPU_SECONDS_PER_COMPLETION = 0.002
+_SESSIONS_PER_WORKER = 4
+_ROUNDS = 5
+
+_SPEC = {"pc": None,
+         "npcs": [{"full_name": f"Resident {i}", "location": f"In room {i} of the castle.",
+                   "description": "A resident of the castle."} for i in range(3)],
+         "setting": "A medieval castle.", "start_hour": 16, "rounds": _ROUNDS}
+
+
+class _BusyCompletion:
+    async def complete(self, context, **kwargs):
+        end = time.process_time() + _CPU_SECONDS_PER_COMPLETION
+        while time.process_time() < end:
+            pass
+        return None
+
+
+def _run_sessions(supervisor: SessionSupervisor, session_ids: list[str]):
+    for session_id in session_ids:
+        supervisor.start_session(session_id, _SPEC)
+    while any(s["running"] for s in supervisor.inspect()["sessions"].values()):
+        time.sleep(0.01)
+    for session_id in session_ids:
+        supervisor.stop_session(session_id)
+
+
+def run(worker_counts: list[int]) -> list[dict]:
+    """Runs the same sessions on each worker count. "speedup" is relative to the first worker
+    count, with enough cores it should grow close to linearly with the number of workers."""
+    session_ids = [f"session-{i}" for i in range(_SESSIONS_PER_WORKER * max(worker_counts))]
+    results = []
+    first = None
+    for workers in worker_counts:
+        with tempfile.TemporaryDirectory() as directory:
+            supervisor = SessionSupervisor(num_workers=workers, completion_factory=_BusyCompletion,
+                                           sessions_dir=os.path.join(directory, "sessions"))
+            supervisor.start()
+            try:
+                result = measure(lambda: _run_sessions(supervisor, session_ids), repeat=3)
+            finally:
+                supervisor.shutdown()
+        first = first or result["seconds_min"]
+        results.append({"name": "SessionSupervisor/sessions", "size": workers,
+                        "speedup": first / result["seconds_min"], **result})
+    return results
@@ -0,0 +1,39 @@
+import random
+import statistics
+import time
+
+_SYLLABLES = ["an", "bel", "cor", "dra", "el", "fen", "gar", "hal", "is", "jor", "ka", "lin",
+              "mor", "nar", "ol", "pel", "quin", "ros", "sar", "tor", "ul", "vel", "wyn", "zar"]
+
+
+def make_words(count: int, seed: int = 0) -> list[str]:
+    """Deterministic, name-like words so fuzzy scores resemble those of real keywords."""
+    rng = random.Random(seed)
+    return ["".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4))) for _ in range(count)]
+
+
+def make_keys(count: int, seed: int = 0) -> list[str]:
+    """Deterministic one to three word keys, unique within the returned list."""
+    rng = random.Random(seed)
+    words = make_words(max(count // 4, 50), seed=seed)
+    keys = set()
+    while len(keys) < count:
+        keys.add(" ".join(rng.choice(words)
+                 for _ in range(rng.randint(1, 3))))
+    return sorted(keys)
+
+
+def measure(fn, repeat: int = 5, budget: float = 2.0) -> dict:
+    """Times `fn()` and returns seconds per call.
+
+    Stops repeating once `budget` seconds have been spent, so the largest sizes stay affordable.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+        if sum(timings) > budget:
+            break
+    return {"seconds_min": min(timings), "seconds_median": statistics.median(timings),
+            "runs": len(timings)}
@@ -0,0 +1,99 @@
+"""Runs the benchmark suite and writes the results as JSON, for comparison between commits.
+
+Examples:
+    python -m benchmarks.run
+    python -m benchmarks.run --max-size 1000000 --output baseline.json
+    python -m benchmarks.run --groups fuzzy --compare baseline.json
+    python -m benchmarks.run --groups supervisor --workers 1 2 4 8
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+_GROUPS = ["fuzzy", "orchestration", "supervisor"]
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(groups: list[str], sizes: list[int], cast_sizes: list[int], worker_counts: list[int]) -> dict:
+    results = []
+    if "fuzzy" in groups:
+        from benchmarks import bench_fuzzy
+        results.extend(bench_fuzzy.run(sizes))
+    if "orchestration" in groups:
+        from benchmarks import bench_orchestration
+        results.extend(bench_orchestration.run(cast_sizes))
+    if "supervisor" in groups:
+        from benchmarks import bench_supervisor
+        results.extend(bench_supervisor.run(worker_counts))
+    return {
+        "commit": _git_commit(),
+        "time": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict):
+    before = {(r["name"], r["size"]): r["seconds_min"]
+              for r in baseline["results"]}
+    for r in current["results"]:
+        old = before.get((r["name"], r["size"]))
+        change = f"{r['seconds_min'] / old:6.2f}x" if old else "     new"
+        print(f"{r['name']:<40} {r['size']:>8} {r['seconds_min'] * 1000:>12.3f} ms {change}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--groups", nargs="+", choices=_GROUPS, default=_GROUPS)
+    parser.add_argument("--max-size", type=int, default=10**4,
+                        help="Largest index size, sizes are the powers of ten from 100 up to this.")
+    parser.add_argument("--cast-sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--workers", type=int, nargs="+",
+                        help="Worker counts for the supervisor group, defaults to the powers of two up to the number of cores.")
+    parser.add_argument("--output", help="Result file, defaults to benchmarks/results/<commit>.json.")
+    parser.add_argument("--compare", help="Earlier result file to compare against.")
+    args = parser.parse_args()
+
+    sizes = []
+    size = 100
+    while size <= args.max_size:
+        sizes.append(size)
+        size *= 10
+
+    worker_counts = args.workers
+    if not worker_counts:
+        worker_counts = [1]
+        while worker_counts[-1] * 2 <= (os.cpu_count() or 1):
+            worker_counts.append(worker_counts[-1] * 2)
+
+    report = run(args.groups, sizes, args.cast_sizes, worker_counts)
+
+    output = args.output or os.path.join(
+        "benchmarks", "results", f"{report['commit'] or 'unknown'}.json")
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output, 'w') as file:
+        json.dump(report, file, indent=2)
+
+    baseline = {"results": []}
+    if args.compare:
+        with open(args.compare, 'r') as file:
+            baseline = json.load(file)
+    compare(report, baseline)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,7 @@ from pygptlink.gpt_no_response_desired import GPTNoResponseDesired
 from pygptlink.gpt_tools import GPTTools
 
 from gptrp.reverse_index import FuzzyReverseIndex
+from gptrp.tool_registry import ToolRegistry
 
 _AGENT_MODEL = "gpt-4o"
 
@@ -155,7 +156,7 @@ Here is the character sheet of the character you're role playing:
         self.actions.clear()
         await completion.complete(context=self.context,
                                   extra_system_prompt=system_prompt,
-                                  gpt_tools=self._describe_methods(),
+                                  gpt_tools=ToolRegistry.tools(self),
                                   force_tool=True)
 
         return self.actions
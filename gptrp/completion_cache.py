@@ -0,0 +1,240 @@
+import asyncio
+import copy
+import hashlib
+import json
+import os
+from enum import Enum, auto
+
+import jsonlines
+
+from gptrp.tool_registry import ToolSet
+
+
+class CacheMode(Enum):
+    RECORD = auto()
+    REPLAY = auto()
+
+
+def _to_json(obj):
+    # Messages and completions may be pydantic models from the OpenAI client.
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+    if hasattr(obj, "__dict__"):
+        return vars(obj)
+    return str(obj)
+
+
+def _stable_default(obj):
+    # Tool descriptions may carry bound methods whose repr contains a memory address,
+    # use the qualified name instead so the hash is stable between runs. Everything else
+    # is hashed by its content.
+    if callable(obj):
+        return getattr(obj, "__qualname__", type(obj).__qualname__)
+    return _to_json(obj)
+
+
+def request_key(context, extra_system_prompt: str = None, gpt_tools: list = None,
+                force_tool=None, allowed_tools: list[str] = None) -> str:
+    """Computes a stable hash of everything that influences a completion request."""
+    if isinstance(gpt_tools, ToolSet):
+        # Already serialized by the registry, no need to walk the descriptions again.
+        gpt_tools = gpt_tools.serialized
+    request = {
+        "model": getattr(context, "model", None),
+        "context": context.context,
+        "extra_system_prompt": extra_system_prompt,
+        "gpt_tools": gpt_tools,
+        "force_tool": force_tool,
+        "allowed_tools": allowed_tools,
+    }
+    serialized = json.dumps(request, sort_keys=True, default=_stable_default)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+def _find_tool(gpt_tools: list, name: str):
+    # The tool descriptions are opaque to us, look for the callable carrying the tool's name.
+    for tool in gpt_tools or []:
+        candidates = tool.values() if isinstance(tool, dict) else vars(tool).values()
+        for candidate in candidates:
+            if callable(candidate) and getattr(candidate, "__name__", None) == name:
+                return candidate
+    return None
+
+
+class CompletionCassette:
+    """An on-disk jsonl log of completions, indexed by request key.
+
+    The same request may be recorded several times, for example when a prompt repeats
+    between rounds. Replaying serves the recordings in the order they were made and
+    keeps serving the last one once they run out.
+    """
+
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+        self.index: dict[str, list[dict]] = {}
+        self._cursors: dict[str, int] = {}
+        try:
+            with jsonlines.open(filepath) as reader:
+                for obj in reader:
+                    self.index.setdefault(obj['key'], []).append(obj)
+        except FileNotFoundError:
+            directory = os.path.dirname(filepath)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(filepath, 'w') as file:
+                pass
+
+    def record(self, key: str, request: dict, response, appends: list[dict], messages: list):
+        # Round trip through JSON so the entry in memory is the same as the one on disk.
+        entry = json.loads(json.dumps({'key': key, 'request': request, 'response': response,
+                                       'appends': appends, 'messages': messages}, default=_to_json))
+        with jsonlines.open(self.filepath, mode='a') as writer:
+            writer.write(entry)
+        self.index.setdefault(key, []).append(entry)
+        return entry
+
+    def lookup(self, key: str):
+        entries = self.index.get(key)
+        if not entries:
+            return None
+        cursor = self._cursors.get(key, 0)
+        self._cursors[key] = cursor + 1
+        return entries[min(cursor, len(entries) - 1)]
+
+
+class _RecordingContext:
+    """Forwards to a context and records the calls made to its append methods.
+
+    Attribute assignments go to the wrapped context, and the proxy reports the class of the
+    wrapped context so that `isinstance` checks of the completion still pass.
+    """
+
+    def __init__(self, context) -> None:
+        object.__setattr__(self, "_context", context)
+        object.__setattr__(self, "appends", [])
+
+    @property
+    def __class__(self):
+        return type(self._context)
+
+    def __setattr__(self, name: str, value):
+        setattr(self._context, name, value)
+
+    def __delattr__(self, name: str):
+        delattr(self._context, name)
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._context, name)
+        if not (name.startswith("append") and callable(attr)):
+            return attr
+
+        def record(*args, **kwargs):
+            self.appends.append(
+                {'method': name, 'args': list(args), 'kwargs': kwargs})
+            return attr(*args, **kwargs)
+        return record
+
+
+# Result given to waiters of a deduplicated request whose leader was cancelled.
+_RETRY = object()
+
+
+class RecordingCompletion:
+    """Drop-in replacement for `GPTCompletion` that records to, or replays from, a cassette.
+
+    In RECORD mode every request is passed to the wrapped completion, and the response is
+    stored in the cassette together with the calls the completion made to the append methods
+    of the context, and the messages that ended up in it. In REPLAY mode the wrapped
+    completion is never called, the recorded append calls are made again on the context and
+    the recorded tool calls are invoked on the tools given with the request, so the
+    orchestration and the context files behave as in the recording.
+
+    With `dedup` enabled, identical requests that are in flight at the same time are only
+    sent once and the result is shared between the callers. If the request is cancelled,
+    one of the other callers sends it again.
+    """
+
+    def __init__(self, cassette_path: str, completion=None, mode: CacheMode = CacheMode.RECORD,
+                 dedup: bool = False):
+        if mode == CacheMode.RECORD and completion is None:
+            raise ValueError("A completion is required to record.")
+        self.completion = completion
+        self.mode = mode
+        self.dedup = dedup
+        self.cassette = CompletionCassette(cassette_path)
+        self._in_flight: dict[str, asyncio.Future] = {}
+
+    async def complete(self, context, callback=None, extra_system_prompt: str = None,
+                       gpt_tools: list = None, force_tool=None, allowed_tools: list[str] = None, **kwargs):
+        key = request_key(context, extra_system_prompt=extra_system_prompt, gpt_tools=gpt_tools,
+                          force_tool=force_tool, allowed_tools=allowed_tools)
+
+        while self.dedup and key in self._in_flight:
+            entry = await asyncio.shield(self._in_flight[key])
+            if entry is not _RETRY:
+                return await self._apply(context, callback, gpt_tools, entry)
+
+        if self.mode == CacheMode.REPLAY:
+            entry = self.cassette.lookup(key)
+            if entry is None:
+                raise KeyError(f"No recorded completion for request {key}")
+            return await self._apply(context, callback, gpt_tools, entry)
+
+        future = asyncio.get_running_loop().create_future()
+        if self.dedup:
+            self._in_flight[key] = future
+        try:
+            request = {
+                "model": getattr(context, "model", None),
+                "extra_system_prompt": extra_system_prompt,
+                "force_tool": force_tool,
+                "allowed_tools": allowed_tools,
+            }
+            if callback:
+                kwargs['callback'] = callback
+            recording_context = _RecordingContext(context)
+            before = {id(m) for m in context.context}
+            response = await self.completion.complete(context=recording_context, extra_system_prompt=extra_system_prompt,
+                                                      gpt_tools=gpt_tools, force_tool=force_tool,
+                                                      allowed_tools=allowed_tools, **kwargs)
+            messages = [m for m in context.context if id(m) not in before]
+            entry = self.cassette.record(
+                key, request, response, recording_context.appends, messages)
+            future.set_result(entry)
+            return response
+        except asyncio.CancelledError:
+            future.set_result(_RETRY)
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Only surface the exception to waiters, if any.
+            future.exception()
+            raise
+        finally:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    async def _apply(self, context, callback, gpt_tools, entry: dict):
+        # Copies, so that contexts sharing a recording don't share its messages.
+        appends = copy.deepcopy(entry['appends'])
+        messages = copy.deepcopy(entry['messages'])
+        if appends:
+            for call in appends:
+                getattr(context, call['method'])(*call['args'], **call['kwargs'])
+        else:
+            # The completion appended to the message list directly.
+            context.context.extend(messages)
+
+        for message in messages:
+            for tool_call in message.get('tool_calls') or []:
+                function = tool_call['function']
+                tool = _find_tool(gpt_tools, function['name'])
+                if tool is None:
+                    continue
+                result = tool(**json.loads(function['arguments'] or "{}"))
+                if asyncio.iscoroutine(result):
+                    await result
+        response = entry['response']
+        if callback and response:
+            callback(response, True)
+        return response
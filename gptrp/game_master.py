@@ -1,31 +1,41 @@
 import csv
 import io
 import math
-import aioconsole
+import os
 from gptrp.character_sheet import CharacterSheet
-from gptrp.agent import Action, ActionType, Agent
+from gptrp.agent import Action, Agent
+from gptrp.player_input import ConsolePlayerInput, PlayerInput
+from gptrp.tool_registry import ToolRegistry
 from pygptlink.gpt_context import GPTContext
 from pygptlink.gpt_completion import GPTCompletion
 from pygptlink.gpt_no_response_desired import GPTNoResponseDesired
 from pygptlink.gpt_tools import GPTTools
 
 _GM_MODEL = "gpt-4o"
+_PERCEIVE_TOOLS = ['perceive', 'advance_time']
+_RESOLVE_TOOLS = ['move_character', 'update_character']
 
 
 class GameMaster(GPTTools):
     def __init__(self, completion: GPTCompletion,
                  pc_cs: CharacterSheet, all_npc_cs: list[CharacterSheet],
-                 setting: str, start_hour: float) -> None:
+                 setting: str, start_hour: float, player_input: PlayerInput = None, session_dir: str = "") -> None:
+        """`pc_cs` may be None to run rounds with NPCs only. `player_input` decides the player
+        character's actions and defaults to asking at the console. All context and memory files
+        of the session are kept under `session_dir`."""
         super().__init__()
-        self.all_tools = self._describe_methods()
+        self.all_tools = ToolRegistry.tools(self)
         self.context = GPTContext(model=_GM_MODEL, max_tokens=8000, max_response_tokens=700,
-                                  persona_file="game_master_persona.txt", context_file="gm_context.jsonl")
+                                  persona_file="game_master_persona.txt",
+                                  context_file=os.path.join(session_dir, "gm_context.jsonl"))
         self.completion = completion
 
         self.hours_passed = start_hour
         self.setting = setting
         self.pc_cs = pc_cs
-        self.npcs = {npc_cs.full_name: Agent(npc_cs) for npc_cs in all_npc_cs}
+        self.player_input = player_input or ConsolePlayerInput()
+        self.npcs = {npc_cs.full_name: Agent(npc_cs, agent_dir=os.path.join(session_dir, "agents", npc_cs.full_name))
+                     for npc_cs in all_npc_cs}
 
         self.tmp_observable_characters: list[str] = None
 
@@ -41,8 +51,11 @@ class GameMaster(GPTTools):
         self.hours_passed += num_hours + num_minutes/60.0
         return GPTNoResponseDesired()
 
+    def is_pc(self, full_name: str):
+        return self.pc_cs is not None and full_name == self.pc_cs.full_name
+
     def get_cs(self, full_name: str):
-        if full_name == self.pc_cs.full_name:
+        if self.is_pc(full_name):
             cs = self.pc_cs
         else:
             cs = self.npcs[full_name]
@@ -57,7 +70,7 @@ class GameMaster(GPTTools):
         if not self.all_characters_valid([full_name]):
             return f"Error: No character by the name {full_name} exists."
 
-        if full_name == self.pc_cs.full_name:
+        if self.is_pc(full_name):
             cs = self.pc_cs
         else:
             cs = self.npcs[full_name]
@@ -73,7 +86,7 @@ class GameMaster(GPTTools):
         Args:
             new_location (str): The current location of the character, free form text. E.g. "in the neighbouring town" or "in the upstairs bedroom".
         """
-        if full_name == self.pc_cs.full_name:
+        if self.is_pc(full_name):
             self.pc_cs.location = new_location
         else:
             npc = self.npcs.get(full_name, None)
@@ -89,7 +102,7 @@ class GameMaster(GPTTools):
             character (str): The full name of an already existing character.
             observation (str): A detailed description of what they perceived with their sight, smell, touch and hearing.
         """
-        if character in self.pc_cs.full_name:
+        if self.pc_cs is not None and character in self.pc_cs.full_name:
             print(f"The game master says: {observation}")
         else:
             npc = self.npcs.get(character, None)
@@ -100,7 +113,7 @@ class GameMaster(GPTTools):
 
     def all_characters_valid(self, characters: list[str]):
         for c in characters:
-            if not (c == self.pc_cs.full_name) and not (c in self.npcs.keys()):
+            if not self.is_pc(c) and not (c in self.npcs.keys()):
                 return False
         return True
 
@@ -115,44 +128,21 @@ class GameMaster(GPTTools):
 
     def all_character_sheets(self):
         cs: list[CharacterSheet] = []
-        cs.append(self.pc_cs)
+        if self.pc_cs is not None:
+            cs.append(self.pc_cs)
         cs.extend([npc.cs for npc in self.npcs.values()])
         cs.sort(key=lambda x: x.full_name)
         return "\n".join([x.render() for x in cs])
 
     def decide_turn_order(self) -> list[str]:
         # This function must make sure that all character names are correctly spelt
-        ans = [self.pc_cs.full_name]
+        ans = [self.pc_cs.full_name] if self.pc_cs is not None else []
         ans.extend(npc for npc in self.npcs.keys())
         return ans
 
     async def do_player_input(self, preliminary_actions: str, time_of_day: str, day: str) -> list[Action]:
-        print(
-            f"""It is your turn to act. The current time is {time_of_day} on day {day} of the adventure.
-
-Your character sheet:
-{self.pc_cs.render()}
-""")
-        if preliminary_actions:
-            print(preliminary_actions)
-        query = ""
-        while not query or query not in "aAsSpP":
-            query = await aioconsole.ainput("Pass (P), Action (A) or Speech (S)? ")
-
-        actions: list[Action] = []
-        if query in "aA":
-            actions.append(Action(self.pc_cs.full_name, ActionType.PERFORM_ACTION, await aioconsole.ainput("What action do you take? ")))
-            words = await aioconsole.ainput("What do you say? ")
-            if words:
-                actions.append(
-                    Action(self.pc_cs.full_name, ActionType.SPEAK, words))
-        elif query in "sS":
-            actions.append(Action(self.pc_cs.full_name, ActionType.SPEAK, await aioconsole.ainput("What do you say? ")))
-            acts = await aioconsole.ainput("What action do you take? ")
-            if acts:
-                actions.append(Action(self.pc_cs.full_name,
-                               ActionType.PERFORM_ACTION, acts))
-        return actions
+        return await self.player_input.get_actions(self.pc_cs, preliminary_actions=preliminary_actions,
+                                                   time_of_day=time_of_day, day=day)
 
     def fmt_p_actions(self, p_actions: list[Action]):
         return "\n---\n".join([x.render() for x in p_actions])
@@ -181,7 +171,7 @@ Immediately after you have called perceive() exactly once for each character, yo
         c = self.context.copy()
         c.append_system_message(prompt)
         await self.completion.complete(
-            context=c, gpt_tools=self.all_tools, force_tool=['perceive', 'advance_time'], extra_system_prompt=self.sticky_prompt())
+            context=c, gpt_tools=ToolRegistry.tools(self, _PERCEIVE_TOOLS), force_tool=_PERCEIVE_TOOLS, extra_system_prompt=self.sticky_prompt())
 
     async def do_partial_observations(self, character: str, p_actions: list[Action]):
         observable_actions_prompt = f"""It is {character}'s turn to act, based on the preliminary actions of other characters listed below, tell {character} what if anything they perceive of these actions.
@@ -228,7 +218,7 @@ Give a summary of the initial environment and situation, as well as where each c
             if character != character_order[0]:
                 observable_actions_str = await self.do_partial_observations(character, p_actions)
 
-            if character == self.pc_cs.full_name:
+            if self.is_pc(character):
                 p_actions.extend(await self.do_player_input(preliminary_actions=observable_actions_str, time_of_day=self.time(),
                                                             day=self.day()))
             else:
@@ -256,7 +246,7 @@ Upon resolving all actions, this round is considered ended.
 The current time is {self.time()}
 Days passed since start: {self.day()}."""
         self.context.append_system_message(prompt)
-        await self.completion.complete(context=self.context, extra_system_prompt=self.sticky_prompt(), gpt_tools=self._describe_methods(), allowed_tools=['move_character', 'update_character'])
+        await self.completion.complete(context=self.context, extra_system_prompt=self.sticky_prompt(), gpt_tools=ToolRegistry.tools(self, _RESOLVE_TOOLS), allowed_tools=_RESOLVE_TOOLS)
 
         # Now the model needs to tell everyone what they observed, this is the ground truth.
         await self.do_perceive()
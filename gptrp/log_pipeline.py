@@ -0,0 +1,87 @@
+import copy
+import json
+import logging
+import queue
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+
+class DeferredQueueHandler(QueueHandler):
+    """A queue handler that leaves the formatting of pre-rendered messages to the listener thread.
+
+    The stock QueueHandler formats the message before enqueueing it, which would put
+    the formatting of large prompt bodies back on the event loop thread. The queue is
+    in-process so records without arguments, like f-strings, are passed along untouched.
+
+    Records with `%` arguments are merged here, before filtering, as the arguments may be
+    changed by the event loop before the listener gets to them. Only the message is
+    rendered, the rest of the formatting is still done by the listener.
+    """
+
+    def handle(self, record: logging.LogRecord):
+        if record.args:
+            record = copy.copy(record)
+            record.msg = record.getMessage()
+            record.args = None
+        return super().handle(record)
+
+    def prepare(self, record: logging.LogRecord):
+        return record
+
+
+class PayloadSampler(logging.Filter):
+    """Only lets through every `sample_every`-th DEBUG record whose rendered message is
+    larger than `max_chars`. Smaller and more severe records always pass."""
+
+    def __init__(self, max_chars: int = 4000, sample_every: int = 10):
+        super().__init__()
+        self.max_chars = max_chars
+        self.sample_every = sample_every
+        self._seen = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or len(record.getMessage()) <= self.max_chars:
+            return True
+        self._seen += 1
+        return self.sample_every <= 1 or self._seen % self.sample_every == 1
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line, truncating messages above `max_chars`."""
+
+    def __init__(self, max_chars: int = 4000):
+        super().__init__()
+        self.max_chars = max_chars
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = record.getMessage()
+        if self.max_chars and len(message) > self.max_chars:
+            message = message[:self.max_chars] + \
+                f"...[{len(message) - self.max_chars} chars truncated]"
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "location": f"{record.filename}:{record.lineno}",
+            "thread": record.threadName,
+            "message": message,
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def attach_queue_logging(logger: logging.Logger, handlers: list[logging.Handler],
+                         max_chars: int = 4000, sample_every: int = 10) -> QueueListener:
+    """Routes all records of `logger` through a queue to `handlers`, which are run on a
+    background listener thread. The returned listener is already started and should be
+    stopped at shutdown to flush any pending records."""
+    log_queue = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(PayloadSampler(
+        max_chars=max_chars, sample_every=sample_every))
+    logger.addHandler(queue_handler)
+
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
@@ -0,0 +1,74 @@
+from abc import ABC, abstractmethod
+
+import aioconsole
+from gptrp.agent import Action, ActionType
+from gptrp.character_sheet import CharacterSheet
+
+
+class PlayerInput(ABC):
+    """Source of the player character's actions for a round."""
+
+    @abstractmethod
+    async def get_actions(self, pc_cs: CharacterSheet, preliminary_actions: str, time_of_day: str, day: str) -> list[Action]:
+        pass
+
+
+class ConsolePlayerInput(PlayerInput):
+    """Asks the player at the console what their character does."""
+
+    async def get_actions(self, pc_cs: CharacterSheet, preliminary_actions: str, time_of_day: str, day: str) -> list[Action]:
+        print(
+            f"""It is your turn to act. The current time is {time_of_day} on day {day} of the adventure.
+
+Your character sheet:
+{pc_cs.render()}
+""")
+        if preliminary_actions:
+            print(preliminary_actions)
+        query = ""
+        while not query or query not in "aAsSpP":
+            query = await aioconsole.ainput("Pass (P), Action (A) or Speech (S)? ")
+
+        actions: list[Action] = []
+        if query in "aA":
+            actions.append(Action(pc_cs.full_name, ActionType.PERFORM_ACTION, await aioconsole.ainput("What action do you take? ")))
+            words = await aioconsole.ainput("What do you say? ")
+            if words:
+                actions.append(
+                    Action(pc_cs.full_name, ActionType.SPEAK, words))
+        elif query in "sS":
+            actions.append(Action(pc_cs.full_name, ActionType.SPEAK, await aioconsole.ainput("What do you say? ")))
+            acts = await aioconsole.ainput("What action do you take? ")
+            if acts:
+                actions.append(Action(pc_cs.full_name,
+                               ActionType.PERFORM_ACTION, acts))
+        return actions
+
+
+class ScriptedPlayerInput(PlayerInput):
+    """Plays the player character from a script, one entry per round.
+
+    Each entry is a dict with optional "action" and "speak" keys, an empty entry passes.
+    Once the script runs out the player passes every round.
+    """
+
+    def __init__(self, script: list[dict] = None) -> None:
+        self.script = list(script or [])
+        self.round = 0
+
+    async def get_actions(self, pc_cs: CharacterSheet, preliminary_actions: str, time_of_day: str, day: str) -> list[Action]:
+        entry = self.script[self.round] if self.round < len(self.script) else {}
+        self.round += 1
+
+        actions: list[Action] = []
+        if entry.get("action"):
+            actions.append(
+                Action(pc_cs.full_name, ActionType.PERFORM_ACTION, entry["action"]))
+        if entry.get("speak"):
+            actions.append(
+                Action(pc_cs.full_name, ActionType.SPEAK, entry["speak"]))
+        return actions
+
+
+class AutoPassPlayerInput(ScriptedPlayerInput):
+    """Always passes."""
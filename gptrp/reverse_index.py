@@ -1,12 +1,60 @@
+import heapq
 import os
+from collections import Counter
 import jsonlines
-from fuzzywuzzy import process
+from fuzzywuzzy import fuzz, utils
+
+
+def _features(processed: str):
+    """Precomputes what `_score_bound` needs to know about a processed key or search term."""
+    tokens = frozenset(processed.split())
+    # The token based scorers compare deduplicated, space joined tokens which can be
+    # shorter than the processed string itself.
+    min_len = min(len(processed), len(" ".join(tokens)))
+    return processed, tokens, Counter(processed), min_len
+
+
+def _score_bound(term, key) -> float:
+    """An upper bound of `fuzz.WRatio` between a processed term and key, cheap to compute.
+
+    Each ratio that WRatio takes the max of is 2*M/T for a pair of strings drawn from the two
+    inputs, and M, the number of matching characters, can't exceed the number of characters
+    the inputs have in common. The exception is a shared token, which the token set ratios can
+    match perfectly. The bound ignores the rounding of the individual ratios, which can add up
+    to one point to the actual score.
+    """
+    term_processed, term_tokens, term_counts, term_min_len = term
+    key_processed, key_tokens, key_counts, key_min_len = key
+    if not term_processed or not key_processed:
+        return 0
+    common = 0
+    for char, count in term_counts.items():
+        key_count = key_counts.get(char)
+        if key_count:
+            common += count if count < key_count else key_count
+    shared_token = not term_tokens.isdisjoint(key_tokens)
+
+    shortest, longest = sorted((len(term_processed), len(key_processed)))
+    bound = 200 * common / (shortest + longest)
+    if longest / shortest < 1.5:
+        tokens = 100 if shared_token else 200 * \
+            common / (term_min_len + key_min_len)
+        return max(bound, 0.95 * tokens)
+
+    # The partial ratios compare the shorter string to an at most equally long substring.
+    partial_scale = 0.6 if longest / shortest > 8 else 0.9
+    partial = 200 * common / (shortest + common)
+    tokens = 100 if shared_token else 200 * \
+        common / (min(term_min_len, key_min_len) + common)
+    return max(bound, partial_scale * partial, partial_scale * 0.95 * tokens)
 
 
 class FuzzyReverseIndex:
     def __init__(self, filepath):
         self.index = {}
         self.filepath = filepath
+        # Built on the first query, so that loading stays cheap.
+        self._key_features = None
         try:
             with jsonlines.open(filepath) as reader:
                 for obj in reader:
@@ -28,16 +76,73 @@ class FuzzyReverseIndex:
             for key in keys:
                 if key not in self.index:
                     self.index[key] = []
+                    if self._key_features is not None:
+                        self._key_features[key] = _features(
+                            utils.full_process(key, force_ascii=True))
                 self.index[key].append(value)
 
+    def _match_terms(self, terms: list[str], threshold: int, limit: int = 5):
+        """Scores all terms against all keys in a single pass over the keys.
+
+        Gives the same matches as `process.extractBests` for each term, but every key is only
+        processed once instead of once per term, and keys whose score bound is below the
+        threshold are never scored.
+        """
+        if self._key_features is None:
+            self._key_features = {key: _features(utils.full_process(key, force_ascii=True))
+                                 for key in self.index}
+
+        # Processed the same way as extractBests processes the query.
+        term_features = {term: _features(utils.full_process(utils.full_process(term), force_ascii=True))
+                         for term in terms}
+        scored = {term: [] for term in term_features}
+        # Leave room for the rounding the bound ignores.
+        cutoff = threshold - 1
+        for key, features in self._key_features.items():
+            for term, term_feature in term_features.items():
+                if cutoff > 0 and _score_bound(term_feature, features) < cutoff:
+                    continue
+                score = fuzz.WRatio(
+                    term_feature[0], features[0], full_process=False)
+                if score >= threshold:
+                    scored[term].append((key, score))
+
+        return {term: [key for key, _ in heapq.nlargest(limit, matches, key=lambda i: i[1])]
+                for term, matches in scored.items()}
+
     def query(self, search_terms: list[str], threshold: int = 80):
-        results = []
-        for term in search_terms:
-            matches = process.extractBests(
-                term, self.index.keys(), score_cutoff=threshold)
-            for key, _ in matches:
-                # Yes, this is O(n^2), the data sets are expected to be small
-                for item in self.index[key]:
-                    if item not in results:
-                        results.append(item)
-        return results
+        return self.query_batch([search_terms], threshold=threshold)[0]
+
+    def query_batch(self, queries: list[list[str]], threshold: int = 80):
+        """Runs several queries against this index at once, each term is only scored once
+        even if it appears in several queries. Returns the results of each query in order."""
+        matches = self._match_terms(
+            list(dict.fromkeys(term for terms in queries for term in terms)), threshold)
+        all_results = []
+        for search_terms in queries:
+            results = []
+            for term in search_terms:
+                for key in matches[term]:
+                    # Yes, this is O(n^2), the data sets are expected to be small
+                    for item in self.index[key]:
+                        if item not in results:
+                            results.append(item)
+            all_results.append(results)
+        return all_results
+
+    @staticmethod
+    def query_many(queries: list[tuple["FuzzyReverseIndex", list[str]]], threshold: int = 80):
+        """Resolves queries against several indexes, e.g. the memories of all agents acting at
+        the same time, in one call. Queries against the same index are batched together."""
+        by_index: dict[int, list[int]] = {}
+        for i, (index, _) in enumerate(queries):
+            by_index.setdefault(id(index), []).append(i)
+
+        all_results = [None] * len(queries)
+        for positions in by_index.values():
+            index = queries[positions[0]][0]
+            results = index.query_batch(
+                [queries[i][1] for i in positions], threshold=threshold)
+            for i, result in zip(positions, results):
+                all_results[i] = result
+        return all_results
@@ -0,0 +1,320 @@
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import os
+import threading
+from multiprocessing.connection import Client, Connection, Listener
+
+from pygptlink.gpt_completion import GPTCompletion
+
+from gptrp.character_sheet import CharacterSheet
+from gptrp.game_master import GameMaster
+from gptrp.player_input import ScriptedPlayerInput
+
+DEFAULT_CONTROL_ADDRESS = "gptrp-supervisor.sock"
+
+logger = logging.getLogger(__name__)
+
+
+def default_completion_factory():
+    return GPTCompletion(api_key=open("api_key.txt", 'r').read().rstrip())
+
+
+def shard_for(session_id: str, num_workers: int) -> int:
+    """Returns the worker that owns the session. Stable across runs and processes, unlike `hash()`."""
+    digest = hashlib.sha1(session_id.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % num_workers
+
+
+def check_session_id(session_id: str):
+    """Session ids name the session's directory, so they must be a single plain path component."""
+    if (not isinstance(session_id, str) or session_id in ("", ".", "..")
+            or os.path.basename(session_id) != session_id
+            or (os.path.altsep and os.path.altsep in session_id)):
+        raise ValueError(f"Invalid session id {session_id!r}.")
+
+
+def authkey_file(address: str) -> str:
+    return address + ".key"
+
+
+def _character_sheet(spec: dict) -> CharacterSheet:
+    return CharacterSheet(spec["full_name"], spec["location"], spec["description"])
+
+
+class _Session:
+    def __init__(self, gm: GameMaster, max_rounds: int) -> None:
+        self.gm = gm
+        self.max_rounds = max_rounds
+        self.rounds = 0
+        self.error: str = None
+        self.task: asyncio.Task = None
+
+    async def run(self):
+        try:
+            while self.max_rounds is None or self.rounds < self.max_rounds:
+                await self.gm.do_round()
+                self.rounds += 1
+        except Exception as e:
+            self.error = repr(e)
+
+    def status(self):
+        return {"rounds": self.rounds, "running": not self.task.done(), "error": self.error,
+                "time": self.gm.time(), "day": self.gm.day()}
+
+
+class _Worker:
+    """Runs the sessions sharded to one worker process on a single event loop."""
+
+    def __init__(self, conn: Connection, completion_factory, sessions_dir: str) -> None:
+        self.conn = conn
+        self.completion = completion_factory()
+        self.sessions_dir = sessions_dir
+        self.sessions: dict[str, _Session] = {}
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            command = await loop.run_in_executor(None, self.conn.recv)
+            if command["cmd"] == "shutdown":
+                for session in self.sessions.values():
+                    session.task.cancel()
+                self.conn.send({"ok": True})
+                return
+            try:
+                reply = self.handle(command)
+            except Exception as e:
+                reply = {"ok": False, "error": repr(e)}
+            self.conn.send(reply)
+
+    def handle(self, command: dict):
+        cmd = command["cmd"]
+        session_id = command.get("session_id")
+        if cmd == "start":
+            if session_id in self.sessions and not self.sessions[session_id].task.done():
+                return {"ok": False, "error": f"Session {session_id} is already running."}
+            check_session_id(session_id)
+            spec = command["spec"]
+            session_dir = os.path.join(self.sessions_dir, session_id)
+            os.makedirs(session_dir, exist_ok=True)
+            pc = _character_sheet(spec["pc"]) if spec.get("pc") else None
+            gm = GameMaster(completion=self.completion, pc_cs=pc,
+                            all_npc_cs=[_character_sheet(npc)
+                                        for npc in spec["npcs"]],
+                            setting=spec["setting"], start_hour=spec.get("start_hour", 0),
+                            player_input=ScriptedPlayerInput(spec.get("script")), session_dir=session_dir)
+            session = _Session(gm, spec.get("rounds"))
+            session.task = asyncio.create_task(session.run())
+            self.sessions[session_id] = session
+            return {"ok": True, "pid": os.getpid()}
+        if cmd == "stop":
+            session = self.sessions.pop(session_id, None)
+            if not session:
+                return {"ok": False, "error": f"No session {session_id}."}
+            session.task.cancel()
+            return {"ok": True, "status": session.status()}
+        if cmd == "inspect":
+            if session_id:
+                session = self.sessions.get(session_id)
+                if not session:
+                    return {"ok": False, "error": f"No session {session_id}."}
+                return {"ok": True, "sessions": {session_id: session.status()}}
+            return {"ok": True, "sessions": {sid: s.status() for sid, s in self.sessions.items()}}
+        return {"ok": False, "error": f"Unknown command {cmd}."}
+
+
+def _worker_main(conn: Connection, completion_factory, sessions_dir: str):
+    asyncio.run(_Worker(conn, completion_factory, sessions_dir).run())
+
+
+class SessionSupervisor:
+    """Shards GameMaster sessions over a pool of worker processes.
+
+    Sessions are assigned to workers by a stable hash of the session id, so a session is
+    always run by the same worker and its files under `sessions_dir/<session_id>` are only
+    ever touched by that worker.
+
+    A session is started from a spec dict:
+        {"pc": {"full_name", "location", "description"} or None,
+         "npcs": [{"full_name", "location", "description"}, ...],
+         "setting": str, "start_hour": float, "rounds": int or None, "script": [...]}
+    """
+
+    def __init__(self, num_workers: int = None, completion_factory=default_completion_factory,
+                 sessions_dir: str = "sessions") -> None:
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.completion_factory = completion_factory
+        self.sessions_dir = sessions_dir
+        self._workers: list[multiprocessing.Process] = []
+        self._conns: list[Connection] = []
+        self._locks: list[threading.Lock] = []
+
+    def start(self):
+        for worker in range(self.num_workers):
+            self._workers.append(None)
+            self._conns.append(None)
+            self._locks.append(threading.Lock())
+            self._spawn(worker)
+
+    def _spawn(self, worker: int):
+        old = self._workers[worker]
+        if old is not None:
+            self._conns[worker].close()
+            if old.is_alive():
+                old.kill()
+            old.join()
+        parent_conn, child_conn = multiprocessing.Pipe()
+        process = multiprocessing.Process(target=_worker_main, daemon=True,
+                                          args=(child_conn, self.completion_factory, self.sessions_dir))
+        process.start()
+        child_conn.close()
+        self._workers[worker] = process
+        self._conns[worker] = parent_conn
+
+    def _request(self, worker: int, command: dict):
+        """Sends a command to a worker and returns its reply. A worker that has died is
+        restarted, the sessions it was running are lost."""
+        with self._locks[worker]:
+            process = self._workers[worker]
+            if not process.is_alive():
+                logger.error("Worker %d exited with code %s, restarting it. Its sessions are lost.",
+                             worker, process.exitcode)
+                self._spawn(worker)
+            try:
+                self._conns[worker].send(command)
+                return self._conns[worker].recv()
+            except (EOFError, OSError) as e:
+                logger.error("Lost the connection to worker %d (%r), restarting it. Its sessions are lost.",
+                             worker, e)
+                self._spawn(worker)
+                return {"ok": False, "error": f"Worker {worker} died, its sessions are lost."}
+
+    def start_session(self, session_id: str, spec: dict):
+        check_session_id(session_id)
+        return self._request(shard_for(session_id, self.num_workers),
+                             {"cmd": "start", "session_id": session_id, "spec": spec})
+
+    def stop_session(self, session_id: str):
+        return self._request(shard_for(session_id, self.num_workers),
+                             {"cmd": "stop", "session_id": session_id})
+
+    def inspect(self, session_id: str = None):
+        if session_id:
+            return self._request(shard_for(session_id, self.num_workers),
+                                 {"cmd": "inspect", "session_id": session_id})
+        sessions = {}
+        for worker in range(self.num_workers):
+            sessions.update(self._request(
+                worker, {"cmd": "inspect"}).get("sessions", {}))
+        return {"ok": True, "sessions": sessions}
+
+    def shutdown(self):
+        for worker, process in enumerate(self._workers):
+            with self._locks[worker]:
+                if process.is_alive():
+                    try:
+                        self._conns[worker].send({"cmd": "shutdown"})
+                        self._conns[worker].recv()
+                    except (EOFError, OSError) as e:
+                        logger.error("Lost the connection to worker %d during shutdown: %r", worker, e)
+                else:
+                    logger.error("Worker %d had already exited with code %s.",
+                                 worker, process.exitcode)
+                process.join(timeout=10)
+                if process.is_alive():
+                    process.kill()
+                    process.join()
+                self._conns[worker].close()
+        self._workers.clear()
+        self._conns.clear()
+        self._locks.clear()
+
+    def handle(self, command: dict):
+        if not isinstance(command, dict):
+            return {"ok": False, "error": f"Commands must be dicts, not {type(command).__name__}."}
+        cmd = command.get("cmd")
+        if cmd == "start":
+            return self.start_session(command["session_id"], command["spec"])
+        if cmd == "stop":
+            return self.stop_session(command["session_id"])
+        if cmd == "inspect":
+            return self.inspect(command.get("session_id"))
+        return {"ok": False, "error": f"Unknown command {cmd}."}
+
+    def serve(self, address: str = DEFAULT_CONTROL_ADDRESS, authkey: bytes = None):
+        """Accepts control commands on a Unix socket until a "shutdown" command is received.
+
+        Commands are dicts as accepted by `handle`, use `send_command` to send them. The socket
+        is only accessible by the owner. Without an `authkey` a random one is generated and
+        written to `authkey_file(address)`, also only readable by the owner.
+        """
+        generated_authkey = authkey is None
+        if generated_authkey:
+            authkey = os.urandom(32)
+            if os.path.exists(authkey_file(address)):
+                os.remove(authkey_file(address))
+            fd = os.open(authkey_file(address),
+                         os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            with os.fdopen(fd, 'wb') as file:
+                file.write(authkey)
+        if os.path.exists(address):
+            # Left behind by a supervisor that didn't shut down cleanly.
+            os.remove(address)
+
+        old_umask = os.umask(0o177)
+        try:
+            listener = Listener(address, family="AF_UNIX", authkey=authkey)
+        finally:
+            os.umask(old_umask)
+        try:
+            with listener:
+                while not self._serve_one(listener):
+                    pass
+        finally:
+            if generated_authkey:
+                os.remove(authkey_file(address))
+
+
+    def _serve_one(self, listener: Listener) -> bool:
+        """Handles a single control connection, returns whether the supervisor was shut down.
+
+        Errors are confined to the connection, a client that fails to authenticate,
+        disconnects early or sends garbage must not take the sessions down with it.
+        """
+        try:
+            conn = listener.accept()
+        except Exception as e:
+            logger.warning("Rejected control connection: %r", e)
+            return False
+        with conn:
+            try:
+                command = conn.recv()
+            except Exception as e:
+                logger.warning("Failed to receive control command: %r", e)
+                return False
+            shutdown = isinstance(command, dict) and command.get("cmd") == "shutdown"
+            if shutdown:
+                self.shutdown()
+                reply = {"ok": True}
+            else:
+                try:
+                    reply = self.handle(command)
+                except Exception as e:
+                    reply = {"ok": False, "error": repr(e)}
+            try:
+                conn.send(reply)
+            except Exception as e:
+                logger.warning("Failed to reply to control command: %r", e)
+        return shutdown
+
+
+def send_command(command: dict, address: str = DEFAULT_CONTROL_ADDRESS, authkey: bytes = None):
+    """Sends a command to the supervisor serving at `address`. The authkey is read from
+    `authkey_file(address)` unless given."""
+    if authkey is None:
+        with open(authkey_file(address), 'rb') as file:
+            authkey = file.read()
+    with Client(address, family="AF_UNIX", authkey=authkey) as conn:
+        conn.send(command)
+        return conn.recv()
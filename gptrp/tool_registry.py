@@ -0,0 +1,163 @@
+import copy
+import functools
+import inspect
+import json
+
+
+class _Unbound:
+    """Stands in for a tool method in the class level template of the tool descriptions."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+
+class ToolSet(tuple):
+    """An immutable list of tool descriptions with the serialized schema precomputed.
+
+    The serialized schema is the same for every instance of a class and is what
+    `completion_cache.request_key` hashes.
+    """
+
+    def __new__(cls, descriptions, names: tuple[str], serialized: str):
+        tool_set = super().__new__(cls, descriptions)
+        tool_set.names = names
+        tool_set.serialized = serialized
+        return tool_set
+
+
+def _unbind(value, instance):
+    if inspect.ismethod(value) and value.__self__ is instance:
+        return _Unbound(value.__name__)
+    if isinstance(value, dict):
+        return {k: _unbind(v, instance) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(_unbind(v, instance) for v in value)
+    if hasattr(value, "__dict__") and not callable(value) and not isinstance(value, type):
+        unbound = copy.copy(value)
+        vars(unbound).update({k: _unbind(v, instance)
+                             for k, v in vars(value).items()})
+        return unbound
+    return value
+
+
+def _bind(value, instance):
+    if isinstance(value, _Unbound):
+        return getattr(instance, value.name)
+    if isinstance(value, dict):
+        return {k: _bind(v, instance) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(_bind(v, instance) for v in value)
+    if hasattr(value, "__dict__") and not callable(value) and not isinstance(value, type):
+        bound = copy.copy(value)
+        vars(bound).update({k: _bind(v, instance)
+                           for k, v in vars(value).items()})
+        return bound
+    return value
+
+
+def _refers_to(value, instance, seen: set) -> bool:
+    """Whether `value` still holds on to `instance` anywhere `_unbind` didn't reach."""
+    if value is instance:
+        return True
+    if id(value) in seen or isinstance(value, (str, bytes, int, float, bool, type(None), type)):
+        return False
+    seen.add(id(value))
+    if inspect.ismethod(value):
+        children = [value.__self__, value.__func__]
+    elif isinstance(value, dict):
+        children = list(value.keys()) + list(value.values())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        children = value
+    elif isinstance(value, functools.partial):
+        children = [value.func, value.args, value.keywords]
+    elif inspect.isfunction(value):
+        children = [cell.cell_contents for cell in value.__closure__ or ()]
+    elif hasattr(value, "__dict__") and not inspect.ismodule(value):
+        children = vars(value).values()
+    else:
+        return False
+    return any(_refers_to(child, instance, seen) for child in children)
+
+
+def _tool_name(description) -> str:
+    def find(value):
+        if isinstance(value, _Unbound):
+            return value.name
+        if isinstance(value, dict):
+            values = value.values()
+        elif isinstance(value, (list, tuple)):
+            values = value
+        elif hasattr(value, "__dict__") and not isinstance(value, type):
+            values = vars(value).values()
+        else:
+            return None
+        for v in values:
+            name = find(v)
+            if name:
+                return name
+        return None
+
+    name = find(description)
+    if name:
+        return name
+    if isinstance(description, dict):
+        return description.get("function", description).get("name")
+    return getattr(description, "name", None)
+
+
+def _serialize(value):
+    if isinstance(value, _Unbound):
+        return value.name
+    return getattr(value, "__dict__", type(value).__qualname__)
+
+
+class ToolRegistry:
+    """Class level cache of the tool descriptions of `GPTTools` subclasses.
+
+    `GPTTools._describe_methods()` introspects the docstrings of every method each time it
+    is called. The registry does this once per class, and keeps a template with the methods
+    unbound. Each instance gets its own descriptions bound to its methods, and the subsets of
+    tools used with `allowed_tools` or `force_tool` are cached views of those. The bound views
+    are stored on the instance itself, so they go away with it.
+    """
+
+    _templates: dict[type, tuple[list, tuple[str], str]] = {}
+
+    @classmethod
+    def _template(cls, instance):
+        template = cls._templates.get(type(instance))
+        if template is None:
+            descriptions = [_unbind(d, instance)
+                            for d in instance._describe_methods()]
+            # Shared by every instance of the class, so it must not act on this one.
+            if _refers_to(descriptions, instance, set()):
+                raise ValueError(f"The tool descriptions of {type(instance).__qualname__} refer to "
+                                 "the instance in a way that can't be unbound, e.g. a method inside a callable.")
+            names = tuple(_tool_name(d) for d in descriptions)
+            serialized = json.dumps(
+                descriptions, sort_keys=True, default=_serialize)
+            template = (descriptions, names, serialized)
+            cls._templates[type(instance)] = template
+        return template
+
+    @classmethod
+    def tools(cls, instance, names: list[str] = None) -> ToolSet:
+        """Returns the tool descriptions of `instance`, optionally only those in `names`."""
+        views = vars(instance).setdefault("_tool_views", {})
+        key = tuple(names) if names is not None else None
+        tool_set = views.get(key)
+        if tool_set is not None:
+            return tool_set
+
+        descriptions, all_names, serialized = cls._template(instance)
+        if key is None:
+            tool_set = ToolSet([_bind(d, instance) for d in descriptions],
+                               all_names, serialized)
+        else:
+            everything = cls.tools(instance)
+            selected = [(d, n) for d, n in zip(everything, all_names) if n in key]
+            tool_set = ToolSet([d for d, _ in selected], tuple(n for _, n in selected),
+                               json.dumps([d for d, n in zip(descriptions, all_names) if n in key],
+                                          sort_keys=True, default=_serialize))
+        views[key] = tool_set
+        return tool_set
@@ -1,5 +1,6 @@
-from logging.handlers import TimedRotatingFileHandler
+from logging.handlers import QueueHandler, TimedRotatingFileHandler
 from datetime import datetime
+import atexit
 import traceback
 import sys
 import os
@@ -9,21 +10,30 @@ from pygptlink.gpt_completion import GPTCompletion
 
 from gptrp.character_sheet import CharacterSheet
 from gptrp.game_master import GameMaster
+from gptrp.log_pipeline import JsonFormatter, attach_queue_logging
 
 
 API_KEY = open("api_key.txt", 'r').read().rstrip()
 
 LOG_DIR = "logs"
 LOG_FILE = f"{LOG_DIR}/gptrp-{datetime.now().strftime('%Y-%m-%d')}.log"
+# Prompt and response payloads larger than this are truncated, and only sampled when queued.
+LOG_MAX_PAYLOAD_CHARS = 4000
+LOG_SAMPLE_EVERY = 10
 
 
-def setup_logger():
+def setup_logger(use_queue: bool = True):
+    """Sets up the pygptlink logger.
+
+    With `use_queue` the handlers run on a background thread and write JSON lines, so that
+    logging on the event loop thread is reduced to a queue put.
+    """
     logger = logging.getLogger("pygptlink")
     logger.setLevel(logging.DEBUG)
 
     # Check if the logger already has a file handler
     file_handler_exists = any(isinstance(
-        handler, TimedRotatingFileHandler) for handler in logger.handlers)
+        handler, (TimedRotatingFileHandler, QueueHandler)) for handler in logger.handlers)
 
     if not file_handler_exists:
         encoding = "utf-8"
@@ -34,16 +44,26 @@ def setup_logger():
         file_handler = TimedRotatingFileHandler(
             LOG_FILE, when="midnight", backupCount=3, encoding=encoding)
         file_handler.setLevel(logging.DEBUG)
-        file_handler.setFormatter(logging.Formatter(
-            '%(asctime)s - %(levelname)s - %(name)s - %(filename)s:%(lineno)d - %(message)s', datefmt=iso8601fmt))
-        logger.addHandler(file_handler)
+        if use_queue:
+            file_handler.setFormatter(JsonFormatter(
+                max_chars=LOG_MAX_PAYLOAD_CHARS))
+        else:
+            file_handler.setFormatter(logging.Formatter(
+                '%(asctime)s - %(levelname)s - %(name)s - %(filename)s:%(lineno)d - %(message)s', datefmt=iso8601fmt))
 
         # Create a stream handler (terminal output)
         stream_handler = logging.StreamHandler()
         stream_handler.setLevel(logging.ERROR)
         stream_handler.setFormatter(logging.Formatter(
             '%(asctime)s - %(levelname)s - %(message)s', datefmt=iso8601fmt))
-        logger.addHandler(stream_handler)
+
+        if use_queue:
+            listener = attach_queue_logging(logger, [file_handler, stream_handler],
+                                            max_chars=LOG_MAX_PAYLOAD_CHARS, sample_every=LOG_SAMPLE_EVERY)
+            atexit.register(listener.stop)
+        else:
+            logger.addHandler(file_handler)
+            logger.addHandler(stream_handler)
 
         # Define a custom exception handler
         def log_uncaught_exceptions(exctype, value, tb):
@@ -0,0 +1,127 @@
+"""Runs a number of rounds without a human player, for soak tests and throughput measurements.
+
+Examples:
+    python simulate.py --rounds 20 --script player_script.jsonl
+    python simulate.py --rounds 5 --npc-only --cassette session.jsonl --replay
+"""
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+
+import jsonlines
+
+from gptrp.character_sheet import CharacterSheet
+from gptrp.completion_cache import CacheMode, RecordingCompletion
+from gptrp.game_master import GameMaster
+from gptrp.player_input import AutoPassPlayerInput, ScriptedPlayerInput
+
+# Rough average for English text with the GPT-4 tokenizers.
+_CHARS_PER_TOKEN = 4
+
+
+class MeteredCompletion:
+    """Wraps a completion and counts completions and estimated tokens sent and received.
+
+    A completion can take several API calls when the model calls tools, those aren't visible
+    from here. The time spent estimating is tracked in `overhead` so it can be left out of
+    the measurements.
+    """
+
+    def __init__(self, completion) -> None:
+        self.completion = completion
+        self.reset()
+
+    def reset(self):
+        self.completions = 0
+        self.est_prompt_tokens = 0
+        self.est_response_tokens = 0
+        self.overhead = 0.0
+
+    async def complete(self, context, extra_system_prompt: str = None, **kwargs):
+        start = time.perf_counter()
+        self.completions += 1
+        prompt = json.dumps(context.context, default=str) + \
+            (extra_system_prompt or "")
+        self.est_prompt_tokens += len(prompt) // _CHARS_PER_TOKEN
+        self.overhead += time.perf_counter() - start
+
+        response = await self.completion.complete(context=context, extra_system_prompt=extra_system_prompt, **kwargs)
+        if response:
+            self.est_response_tokens += len(response) // _CHARS_PER_TOKEN
+        return response
+
+
+def make_completion(args):
+    if args.replay:
+        return RecordingCompletion(args.cassette, mode=CacheMode.REPLAY)
+
+    from pygptlink.gpt_completion import GPTCompletion
+    completion = GPTCompletion(api_key=open(args.api_key, 'r').read().rstrip())
+    if args.cassette:
+        return RecordingCompletion(args.cassette, completion=completion)
+    return completion
+
+
+async def simulate(args):
+    if args.script:
+        with jsonlines.open(args.script) as reader:
+            player_input = ScriptedPlayerInput(list(reader))
+    else:
+        player_input = AutoPassPlayerInput()
+
+    pc = None if args.npc_only else CharacterSheet("Emi", "At the main gate of the castle.",
+                                                   "Young knight.")
+    ravenheart_cs = CharacterSheet("Ravenheart", "In the castle's throne room",
+                                   "description")
+
+    completion = MeteredCompletion(make_completion(args))
+    gm = GameMaster(completion=completion, pc_cs=pc, all_npc_cs=[ravenheart_cs],
+                    setting="The story takes place in a medieval fantasy world where magic exists and only a few are able to use it.",
+                    start_hour=16, player_input=player_input,
+                    session_dir=args.session_dir or tempfile.mkdtemp(prefix="gptrp-simulate-"))
+
+    report = []
+    for i in range(args.rounds):
+        completion.reset()
+        start = time.perf_counter()
+        await gm.do_round()
+        elapsed = time.perf_counter() - start - completion.overhead
+        report.append({"round": i, "seconds": elapsed, "completions": completion.completions,
+                       "est_prompt_tokens": completion.est_prompt_tokens,
+                       "est_response_tokens": completion.est_response_tokens})
+        print(f"Round {i}: {elapsed:.2f}s, {completion.completions} completions, "
+              f"~{completion.est_prompt_tokens} prompt tokens, ~{completion.est_response_tokens} response tokens (estimated)")
+
+    total = sum(r["seconds"] for r in report)
+    print(f"{args.rounds} rounds in {total:.2f}s ({total / max(args.rounds, 1):.2f}s per round)")
+    if args.report:
+        with jsonlines.open(args.report, mode='w') as writer:
+            writer.write_all(report)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=10,
+                        help="Number of rounds to run.")
+    parser.add_argument("--script", help="jsonl file with one player entry per round, "
+                        "each with optional \"action\" and \"speak\" keys. The player passes when omitted.")
+    parser.add_argument("--npc-only", action="store_true",
+                        help="Run without a player character.")
+    parser.add_argument("--cassette", help="Record completions to this cassette.")
+    parser.add_argument("--replay", action="store_true",
+                        help="Replay completions from --cassette instead of calling the API.")
+    parser.add_argument("--session-dir", help="Directory for the session's context and memory files. "
+                        "Defaults to a new temporary directory, so every run starts from scratch.")
+    parser.add_argument("--api-key", default="api_key.txt",
+                        help="File containing the API key.")
+    parser.add_argument("--report", help="Write the per round report to this jsonl file.")
+    args = parser.parse_args()
+    if args.replay and not args.cassette:
+        parser.error("--replay requires --cassette")
+    asyncio.run(simulate(args))
+
+
+if __name__ == "__main__":
+    main()
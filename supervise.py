@@ -0,0 +1,56 @@
+"""Runs GameMaster sessions sharded over worker processes, and controls them.
+
+Examples:
+    python supervise.py serve --workers 8
+    python supervise.py start castle castle_spec.json
+    python supervise.py inspect
+    python supervise.py stop castle
+    python supervise.py shutdown
+"""
+import argparse
+import json
+
+from gptrp.supervisor import DEFAULT_CONTROL_ADDRESS, SessionSupervisor, send_command
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--address", default=DEFAULT_CONTROL_ADDRESS,
+                        help="Path of the supervisor's Unix control socket.")
+    parser.add_argument("--authkey", help="Hex encoded key for the control socket. By default serve "
+                        "generates a random key and writes it to <address>.key, where the other commands read it.")
+    subparsers = parser.add_subparsers(dest="cmd", required=True)
+    serve = subparsers.add_parser("serve", help="Start the supervisor and its workers.")
+    serve.add_argument("--workers", type=int,
+                       help="Number of worker processes, defaults to the number of cores.")
+    serve.add_argument("--sessions-dir", default="sessions")
+    start = subparsers.add_parser("start", help="Start a session.")
+    start.add_argument("session_id")
+    start.add_argument("spec", help="JSON file with the session spec.")
+    stop = subparsers.add_parser("stop", help="Stop a session.")
+    stop.add_argument("session_id")
+    inspect = subparsers.add_parser("inspect", help="Show the status of sessions.")
+    inspect.add_argument("session_id", nargs="?")
+    subparsers.add_parser("shutdown", help="Stop all sessions and the supervisor.")
+    args = parser.parse_args()
+    authkey = bytes.fromhex(args.authkey) if args.authkey else None
+
+    if args.cmd == "serve":
+        supervisor = SessionSupervisor(
+            num_workers=args.workers, sessions_dir=args.sessions_dir)
+        supervisor.start()
+        supervisor.serve(address=args.address, authkey=authkey)
+        return
+
+    command = {"cmd": args.cmd}
+    if getattr(args, "session_id", None):
+        command["session_id"] = args.session_id
+    if args.cmd == "start":
+        with open(args.spec, 'r') as file:
+            command["spec"] = json.load(file)
+    print(json.dumps(send_command(
+        command, address=args.address, authkey=authkey), indent=2))
+
+
+if __name__ == "__main__":
+    main()
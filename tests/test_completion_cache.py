@@ -0,0 +1,210 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+
+from gptrp.completion_cache import CacheMode, RecordingCompletion, request_key
+
+try:
+    from pygptlink.gpt_context import GPTContext
+except ImportError:
+    GPTContext = None
+
+
+class FakeContext:
+    def __init__(self):
+        self.model = "fake-model"
+        self.context = [{'role': 'system', 'content': 'You are a test.'}]
+        self.appended = []
+
+    def append_completion(self, message: dict):
+        self.appended.append(message)
+        self.context.append(message)
+
+    def append_tool_response(self, id: str, content: str):
+        self.appended.append(id)
+        self.context.append(
+            {'role': 'tool', 'tool_call_id': id, 'content': content})
+
+
+class FakeCompletion:
+    def __init__(self, delay: float = 0):
+        self.calls = 0
+        self.delay = delay
+
+    async def complete(self, context, extra_system_prompt=None, gpt_tools=None, force_tool=None, allowed_tools=None):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        context.append_completion({'role': 'assistant', 'content': None, 'tool_calls': [
+            {'id': 'call_1', 'type': 'function', 'function': {'name': 'speak', 'arguments': json.dumps({'message': 'Hello'})}}]})
+        context.append_tool_response('call_1', 'None')
+        await gpt_tools[0]['callable'](message='Hello')
+        return f"response {self.calls}"
+
+
+class TrimmingCompletion:
+    """Replaces the message list of the context, as completions that trim it do."""
+
+    async def complete(self, context, **kwargs):
+        assert isinstance(context, FakeContext)
+        context.context = context.context[1:]
+        context.append_completion({'role': 'assistant', 'content': 'Trimmed.'})
+        return "Trimmed."
+
+
+class SystemMessageCompletion:
+    async def complete(self, context, **kwargs):
+        assert isinstance(context, GPTContext)
+        context.append_system_message("The king enters.")
+        return "The king enters."
+
+
+class Message:
+    """Stands in for the pydantic message models of the OpenAI client."""
+
+    def __init__(self, content: str):
+        self.role = 'assistant'
+        self.content = content
+
+    def model_dump(self):
+        return {'role': self.role, 'content': self.content}
+
+
+class Speaker:
+    def __init__(self):
+        self.spoken = []
+
+    async def speak(self, message: str):
+        self.spoken.append(message)
+
+
+class TestRecordingCompletion(unittest.TestCase):
+    def setUp(self):
+        self.cassette = 'test_cassette.jsonl'
+
+    def tools(self, speaker):
+        return [{'name': 'speak', 'callable': speaker.speak}]
+
+    def test_record_then_replay(self):
+        completion = FakeCompletion()
+        recorder = RecordingCompletion(self.cassette, completion=completion)
+        response = asyncio.run(recorder.complete(
+            context=FakeContext(), extra_system_prompt="extra", gpt_tools=self.tools(Speaker())))
+        self.assertEqual(response, "response 1")
+
+        replayer = RecordingCompletion(self.cassette, mode=CacheMode.REPLAY)
+        speaker = Speaker()
+        context = FakeContext()
+        response = asyncio.run(replayer.complete(
+            context=context, extra_system_prompt="extra", gpt_tools=self.tools(speaker)))
+        self.assertEqual(response, "response 1")
+        self.assertEqual(speaker.spoken, ['Hello'])
+        self.assertEqual(len(context.context), 3)
+        self.assertEqual(context.appended[1], 'call_1')
+        self.assertEqual(completion.calls, 1)
+
+    def test_replayed_messages_are_copies(self):
+        recorder = RecordingCompletion(self.cassette, completion=FakeCompletion())
+        asyncio.run(recorder.complete(context=FakeContext(), gpt_tools=self.tools(Speaker())))
+
+        replayer = RecordingCompletion(self.cassette, mode=CacheMode.REPLAY)
+        first, second = FakeContext(), FakeContext()
+        asyncio.run(replayer.complete(context=first, gpt_tools=self.tools(Speaker())))
+        asyncio.run(replayer.complete(context=second, gpt_tools=self.tools(Speaker())))
+        self.assertEqual(first.context, second.context)
+        self.assertIsNot(first.context[1], second.context[1])
+
+    def test_replay_miss(self):
+        replayer = RecordingCompletion(self.cassette, mode=CacheMode.REPLAY)
+        with self.assertRaises(KeyError):
+            asyncio.run(replayer.complete(context=FakeContext(), extra_system_prompt="other"))
+
+    def test_dedup_in_flight(self):
+        completion = FakeCompletion()
+        recorder = RecordingCompletion(
+            self.cassette, completion=completion, dedup=True)
+        speakers = [Speaker(), Speaker()]
+
+        async def run():
+            return await asyncio.gather(*[recorder.complete(context=FakeContext(), gpt_tools=self.tools(s))
+                                          for s in speakers])
+
+        responses = asyncio.run(run())
+        self.assertEqual(responses, ["response 1", "response 1"])
+        self.assertEqual(completion.calls, 1)
+        self.assertEqual([s.spoken for s in speakers], [['Hello'], ['Hello']])
+
+    def test_dedup_retries_when_leader_is_cancelled(self):
+        completion = FakeCompletion(delay=0.01)
+        recorder = RecordingCompletion(
+            self.cassette, completion=completion, dedup=True)
+        speaker = Speaker()
+
+        async def run():
+            leader = asyncio.create_task(recorder.complete(
+                context=FakeContext(), gpt_tools=self.tools(Speaker())))
+            await asyncio.sleep(0)
+            waiter = asyncio.create_task(recorder.complete(
+                context=FakeContext(), gpt_tools=self.tools(speaker)))
+            await asyncio.sleep(0)
+            leader.cancel()
+            return await waiter
+
+        self.assertEqual(asyncio.run(run()), "response 2")
+        self.assertEqual(completion.calls, 2)
+        self.assertEqual(speaker.spoken, ['Hello'])
+
+    def test_recording_context_forwards_assignments(self):
+        recorder = RecordingCompletion(
+            self.cassette, completion=TrimmingCompletion())
+        context = FakeContext()
+        asyncio.run(recorder.complete(context=context))
+        self.assertEqual(context.context, [{'role': 'assistant', 'content': 'Trimmed.'}])
+
+    @unittest.skipUnless(GPTContext, "pygptlink is not installed")
+    def test_record_then_replay_with_gpt_context(self):
+        with tempfile.TemporaryDirectory() as directory:
+            persona_file = os.path.join(directory, "persona.txt")
+            with open(persona_file, 'w') as file:
+                file.write("You are a test.")
+
+            def make_context(name: str):
+                return GPTContext(model="gpt-4", max_tokens=1000, max_response_tokens=100,
+                                  persona_file=persona_file, context_file=os.path.join(directory, name))
+
+            recorded = make_context("recorded.jsonl")
+            recorder = RecordingCompletion(
+                self.cassette, completion=SystemMessageCompletion())
+            asyncio.run(recorder.complete(context=recorded))
+
+            replayed = make_context("replayed.jsonl")
+            replayer = RecordingCompletion(self.cassette, mode=CacheMode.REPLAY)
+            self.assertEqual(asyncio.run(replayer.complete(
+                context=replayed)), "The king enters.")
+            self.assertEqual(replayed.context, recorded.context)
+
+    def tearDown(self):
+        os.remove(self.cassette)
+
+
+class TestRequestKey(unittest.TestCase):
+    def context(self, message):
+        context = FakeContext()
+        context.context.append(message)
+        return context
+
+    def test_message_objects_are_hashed_by_content(self):
+        sword = request_key(self.context(Message("The king draws his sword.")))
+        bow = request_key(self.context(Message("The king bows.")))
+        self.assertNotEqual(sword, bow)
+        self.assertEqual(sword, request_key(
+            self.context(Message("The king draws his sword."))))
+
+    def test_tools_are_hashed_by_name(self):
+        self.assertEqual(request_key(FakeContext(), gpt_tools=[{'callable': Speaker().speak}]),
+                         request_key(FakeContext(), gpt_tools=[{'callable': Speaker().speak}]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import shutil
+import tempfile
+import unittest
+
+from gptrp.character_sheet import CharacterSheet
+from gptrp.game_master import GameMaster
+from gptrp.player_input import AutoPassPlayerInput
+
+
+class FakeCompletion:
+    async def complete(self, context, **kwargs):
+        return None
+
+
+class TestGameMasterNpcOnly(unittest.TestCase):
+    def setUp(self):
+        self.session_dir = tempfile.mkdtemp()
+        npcs = [CharacterSheet("Ravenheart", "In the castle's throne room", "The king."),
+                CharacterSheet("Aldric", "In the stables", "A stable hand.")]
+        self.gm = GameMaster(completion=FakeCompletion(), pc_cs=None, all_npc_cs=npcs,
+                             setting="A medieval castle.", start_hour=16,
+                             player_input=AutoPassPlayerInput(), session_dir=self.session_dir)
+
+    def test_decide_turn_order(self):
+        self.assertEqual(self.gm.decide_turn_order(), ["Ravenheart", "Aldric"])
+
+    def test_all_characters_valid(self):
+        self.assertTrue(self.gm.all_characters_valid(["Ravenheart", "Aldric"]))
+        self.assertFalse(self.gm.all_characters_valid(["Emi"]))
+
+    def test_all_character_sheets(self):
+        sheets = self.gm.all_character_sheets()
+        self.assertIn("Full name: Aldric", sheets)
+        self.assertIn("Full name: Ravenheart", sheets)
+        self.assertLess(sheets.index("Aldric"), sheets.index("Ravenheart"))
+
+    def tearDown(self):
+        shutil.rmtree(self.session_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import json
+import logging
+import queue
+import unittest
+
+from gptrp.log_pipeline import DeferredQueueHandler, JsonFormatter, PayloadSampler, attach_queue_logging
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(self.format(record))
+
+
+class TestLogPipeline(unittest.TestCase):
+    def setUp(self):
+        self.logger = logging.getLogger("test_log_pipeline")
+        self.logger.setLevel(logging.DEBUG)
+        self.logger.propagate = False
+        self.handler = ListHandler()
+        self.handler.setFormatter(JsonFormatter(max_chars=10))
+
+    def test_records_are_written_as_truncated_json(self):
+        listener = attach_queue_logging(self.logger, [self.handler], max_chars=10)
+        self.logger.info("a" * 25)
+        listener.stop()
+
+        entry = json.loads(self.handler.lines[0])
+        self.assertEqual(entry["level"], "INFO")
+        self.assertEqual(entry["message"], "a" * 10 + "...[15 chars truncated]")
+
+    def test_large_debug_payloads_are_sampled(self):
+        listener = attach_queue_logging(
+            self.logger, [self.handler], max_chars=10, sample_every=3)
+        for _ in range(6):
+            self.logger.debug("b" * 25)
+        self.logger.debug("small")
+        self.logger.error("c" * 25)
+        listener.stop()
+
+        messages = [json.loads(line)["message"] for line in self.handler.lines]
+        self.assertEqual(len(messages), 4)
+        self.assertEqual(messages[2], "small")
+
+    def test_sampler_passes_small_records(self):
+        sampler = PayloadSampler(max_chars=10, sample_every=100)
+        record = self.logger.makeRecord(
+            self.logger.name, logging.DEBUG, __file__, 0, "small", None, None)
+        self.assertTrue(sampler.filter(record))
+
+    def test_large_arguments_are_sampled(self):
+        sampler = PayloadSampler(max_chars=10, sample_every=100)
+        records = [self.logger.makeRecord(self.logger.name, logging.DEBUG, __file__, 0,
+                                          "Prompt: %s", ("b" * 25,), None) for _ in range(2)]
+        self.assertEqual([sampler.filter(r) for r in records], [True, False])
+
+    def test_arguments_are_frozen_when_logged(self):
+        log_queue = queue.SimpleQueue()
+        self.logger.addHandler(DeferredQueueHandler(log_queue))
+        context = {"round": 1}
+        self.logger.debug("Context: %s", context)
+        context["round"] = 2
+        self.assertEqual(log_queue.get_nowait().getMessage(), "Context: {'round': 1}")
+
+    def tearDown(self):
+        self.logger.handlers.clear()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import asyncio
+import unittest
+
+from gptrp.agent import ActionType
+from gptrp.character_sheet import CharacterSheet
+from gptrp.player_input import AutoPassPlayerInput, ScriptedPlayerInput
+
+
+class TestScriptedPlayerInput(unittest.TestCase):
+    def setUp(self):
+        self.pc = CharacterSheet("Emi", "At the main gate of the castle.", "Young knight.")
+
+    def get_actions(self, player_input):
+        return asyncio.run(player_input.get_actions(self.pc, preliminary_actions=None,
+                                                    time_of_day="16:00", day="0"))
+
+    def test_script_entries_become_actions(self):
+        player_input = ScriptedPlayerInput([{'action': 'Opens the gate.', 'speak': 'Hello!'},
+                                            {'speak': 'Anyone there?'}])
+
+        actions = self.get_actions(player_input)
+        self.assertEqual([(a.character, a.type, a.description) for a in actions],
+                         [("Emi", ActionType.PERFORM_ACTION, 'Opens the gate.'),
+                          ("Emi", ActionType.SPEAK, 'Hello!')])
+
+        actions = self.get_actions(player_input)
+        self.assertEqual([(a.type, a.description) for a in actions],
+                         [(ActionType.SPEAK, 'Anyone there?')])
+
+    def test_passes_once_script_runs_out(self):
+        player_input = ScriptedPlayerInput([{}, {'speak': 'Hello!'}])
+        self.assertEqual(self.get_actions(player_input), [])
+        self.assertEqual(len(self.get_actions(player_input)), 1)
+        self.assertEqual(self.get_actions(player_input), [])
+        self.assertEqual(self.get_actions(player_input), [])
+
+    def test_auto_pass(self):
+        self.assertEqual(self.get_actions(AutoPassPlayerInput()), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,9 @@
 import os
+import random
 import unittest
 
+from fuzzywuzzy import process
+
 from gptrp.reverse_index import FuzzyReverseIndex
 
 
@@ -44,6 +47,43 @@ class TestFuzzyReverseIndex(unittest.TestCase):
         self.assertEqual(len(result), len(set(result_tuples)),
                          "Query results contain duplicates")
 
+    def test_query_batch(self):
+        results = self.index.query_batch([['apple'], ['orange', 'appel'], []])
+        self.assertEqual(results, [[{'id': 1, 'text': 'Fruit basket'}],
+                                   [{'id': 2, 'text': 'Tropical fruits'}, {'id': 1, 'text': 'Fruit basket'}],
+                                   []])
+
+    def test_query_many(self):
+        other = FuzzyReverseIndex('test_index_other.jsonl')
+        other.index_document(['grape'], {'id': 5, 'text': 'Vineyard'})
+        try:
+            results = FuzzyReverseIndex.query_many(
+                [(self.index, ['grape']), (other, ['grape']), (self.index, ['orange'])])
+        finally:
+            os.remove('test_index_other.jsonl')
+        self.assertEqual(results, [[], [{'id': 5, 'text': 'Vineyard'}],
+                                   [{'id': 2, 'text': 'Tropical fruits'}]])
+
+    def test_matches_extract_bests(self):
+        rng = random.Random(0)
+        words = ["".join(rng.choice("abcdeilnorst") for _ in range(rng.randint(2, 8)))
+                 for _ in range(60)]
+        for i in range(200):
+            self.index.index_document(
+                [" ".join(rng.sample(words, rng.randint(1, 3)))], i)
+        keys = list(self.index.index.keys())
+
+        for threshold in [0, 50, 70, 80, 95]:
+            for _ in range(20):
+                term = rng.choice([rng.choice(keys)[:rng.randint(1, 10)], rng.choice(words)])
+                expected = []
+                for key, _ in process.extractBests(term, self.index.index.keys(), score_cutoff=threshold):
+                    for item in self.index.index[key]:
+                        if item not in expected:
+                            expected.append(item)
+                self.assertEqual(self.index.query(
+                    [term], threshold=threshold), expected)
+
     def tearDown(self):
         os.remove('test_index.jsonl')
 
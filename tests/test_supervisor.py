@@ -0,0 +1,167 @@
+import asyncio
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import unittest
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client
+
+from gptrp.supervisor import (SessionSupervisor, _Worker, authkey_file, check_session_id,
+                              send_command, shard_for)
+
+
+class FakeCompletion:
+    async def complete(self, context, **kwargs):
+        return None
+
+
+_SPEC = {"pc": None,
+         "npcs": [{"full_name": "Ravenheart", "location": "In the castle's throne room", "description": "The king."}],
+         "setting": "A medieval castle.", "start_hour": 16, "rounds": 0}
+
+
+class TestSharding(unittest.TestCase):
+    def test_shard_is_stable(self):
+        # Unlike hash(), must not change between processes or runs.
+        self.assertEqual(shard_for("castle", 4), 1)
+        self.assertEqual(shard_for("castle", 7), 1)
+
+    def test_shard_in_range(self):
+        for num_workers in [1, 2, 3, 8]:
+            for i in range(100):
+                self.assertIn(shard_for(f"session-{i}", num_workers), range(num_workers))
+
+    def test_check_session_id(self):
+        check_session_id("castle-1")
+        for session_id in ["", ".", "..", "../castle", "/tmp/castle", "a/b", None]:
+            with self.assertRaises(ValueError):
+                check_session_id(session_id)
+
+
+class TestWorker(unittest.TestCase):
+    def setUp(self):
+        self.sessions_dir = tempfile.mkdtemp()
+        self.worker = _Worker(conn=None, completion_factory=FakeCompletion,
+                              sessions_dir=self.sessions_dir)
+
+    def run_commands(self, *commands):
+        async def run():
+            replies = []
+            for command in commands:
+                replies.append(self.worker.handle(command))
+                # Let the started sessions run.
+                await asyncio.sleep(0)
+            return replies
+        return asyncio.run(run())
+
+    def test_start_inspect_stop(self):
+        start, inspect, stop, inspect_after = self.run_commands(
+            {"cmd": "start", "session_id": "castle", "spec": _SPEC},
+            {"cmd": "inspect"},
+            {"cmd": "stop", "session_id": "castle"},
+            {"cmd": "inspect", "session_id": "castle"})
+        self.assertTrue(start["ok"])
+        self.assertTrue(os.path.isdir(os.path.join(self.sessions_dir, "castle")))
+        self.assertEqual(list(inspect["sessions"]), ["castle"])
+        self.assertEqual(inspect["sessions"]["castle"]["rounds"], 0)
+        self.assertTrue(stop["ok"])
+        self.assertFalse(inspect_after["ok"])
+
+    def test_start_rejects_escaping_session_id(self):
+        with self.assertRaises(ValueError):
+            self.run_commands({"cmd": "start", "session_id": "../castle", "spec": _SPEC})
+
+    def test_stop_unknown_session(self):
+        self.assertFalse(self.run_commands({"cmd": "stop", "session_id": "castle"})[0]["ok"])
+
+    def test_unknown_command(self):
+        reply = self.run_commands({"cmd": "teleport"})[0]
+        self.assertFalse(reply["ok"])
+        self.assertIn("teleport", reply["error"])
+
+    def tearDown(self):
+        shutil.rmtree(self.sessions_dir)
+
+
+class TestSessionSupervisor(unittest.TestCase):
+    def setUp(self):
+        self.sessions_dir = tempfile.mkdtemp()
+        self.supervisor = SessionSupervisor(num_workers=2, completion_factory=FakeCompletion,
+                                            sessions_dir=self.sessions_dir)
+        self.supervisor.start()
+
+    def kill_worker(self, worker: int):
+        process = self.supervisor._workers[worker]
+        process.kill()
+        process.join()
+
+    def test_sessions_run_on_their_shard(self):
+        session_ids = [f"session-{i}" for i in range(4)]
+        for session_id in session_ids:
+            reply = self.supervisor.start_session(session_id, _SPEC)
+            self.assertTrue(reply["ok"])
+            self.assertEqual(reply["pid"], self.supervisor._workers[shard_for(session_id, 2)].pid)
+        self.assertEqual(sorted(self.supervisor.inspect()["sessions"]), session_ids)
+        self.assertTrue(self.supervisor.stop_session("session-0")["ok"])
+        self.assertNotIn("session-0", self.supervisor.inspect()["sessions"])
+
+    def test_dead_worker_is_restarted(self):
+        worker = shard_for("castle", 2)
+        self.kill_worker(worker)
+        self.assertTrue(self.supervisor.start_session("castle", _SPEC)["ok"])
+        self.assertEqual(list(self.supervisor.inspect()["sessions"]), ["castle"])
+
+    def test_shutdown_skips_dead_workers(self):
+        processes = list(self.supervisor._workers)
+        self.kill_worker(0)
+        self.supervisor.shutdown()
+        self.assertFalse(any(process.is_alive() for process in processes))
+
+    def tearDown(self):
+        self.supervisor.shutdown()
+        shutil.rmtree(self.sessions_dir)
+
+
+class TestControlChannel(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.address = os.path.join(self.directory, "supervisor.sock")
+        self.supervisor = SessionSupervisor(num_workers=1, completion_factory=FakeCompletion,
+                                            sessions_dir=os.path.join(self.directory, "sessions"))
+        self.supervisor.start()
+        self.server = threading.Thread(target=self.supervisor.serve, args=(self.address,))
+        self.server.start()
+        while not os.path.exists(self.address):
+            time.sleep(0.01)
+
+    def test_socket_and_key_are_private(self):
+        self.assertEqual(os.stat(self.address).st_mode & 0o777, 0o600)
+        self.assertEqual(os.stat(authkey_file(self.address)).st_mode & 0o777, 0o600)
+
+    def test_bad_clients_do_not_stop_the_supervisor(self):
+        with self.assertRaises(AuthenticationError):
+            Client(self.address, family="AF_UNIX", authkey=b"wrong key")
+        with socket.socket(socket.AF_UNIX) as client:
+            client.connect(self.address)
+        with open(authkey_file(self.address), 'rb') as file:
+            with Client(self.address, family="AF_UNIX", authkey=file.read()) as conn:
+                conn.send(["not", "a", "dict"])
+                self.assertFalse(conn.recv()["ok"])
+
+        self.assertTrue(send_command({"cmd": "start", "session_id": "castle", "spec": _SPEC},
+                                     address=self.address)["ok"])
+        self.assertEqual(list(send_command({"cmd": "inspect"}, address=self.address)["sessions"]),
+                         ["castle"])
+
+    def tearDown(self):
+        self.assertTrue(send_command({"cmd": "shutdown"}, address=self.address)["ok"])
+        self.server.join()
+        self.assertFalse(os.path.exists(authkey_file(self.address)))
+        shutil.rmtree(self.directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
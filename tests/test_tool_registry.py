@@ -0,0 +1,85 @@
+import gc
+import unittest
+import weakref
+
+from gptrp.tool_registry import ToolRegistry
+
+
+class FakeTools:
+    describe_calls = 0
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    async def greet(self):
+        return f"Hello from {self.name}"
+
+    async def wave(self):
+        return f"{self.name} waves"
+
+    def _describe_methods(self):
+        FakeTools.describe_calls += 1
+        return [{'type': 'function', 'function': {'name': method.__name__}, 'callable': method}
+                for method in [self.greet, self.wave]]
+
+
+class Invoker:
+    def __init__(self, method):
+        self.method = method
+
+    def __call__(self, *args, **kwargs):
+        return self.method(*args, **kwargs)
+
+
+class WrappedTools(FakeTools):
+    def _describe_methods(self):
+        return [{'type': 'function', 'function': {'name': 'greet'}, 'callable': Invoker(self.greet)}]
+
+
+class TestToolRegistry(unittest.TestCase):
+    def setUp(self):
+        FakeTools.describe_calls = 0
+        ToolRegistry._templates.pop(FakeTools, None)
+
+    def test_introspects_once_per_class(self):
+        first, second = FakeTools("first"), FakeTools("second")
+        ToolRegistry.tools(first)
+        ToolRegistry.tools(second)
+        ToolRegistry.tools(second)
+        self.assertEqual(FakeTools.describe_calls, 1)
+
+    def test_tools_are_bound_to_their_instance(self):
+        first, second = FakeTools("first"), FakeTools("second")
+        ToolRegistry.tools(first)
+        tools = ToolRegistry.tools(second)
+        self.assertEqual(tools.names, ('greet', 'wave'))
+        self.assertEqual(tools[0]['callable'], second.greet)
+        self.assertEqual(ToolRegistry.tools(first).serialized, tools.serialized)
+
+    def test_subset_views_are_cached(self):
+        instance = FakeTools("instance")
+        view = ToolRegistry.tools(instance, ['wave'])
+        self.assertEqual(view.names, ('wave',))
+        self.assertEqual(view[0]['callable'], instance.wave)
+        self.assertIs(ToolRegistry.tools(instance, ['wave']), view)
+        self.assertIs(ToolRegistry.tools(instance), ToolRegistry.tools(instance))
+
+    def test_template_must_not_keep_the_instance(self):
+        ToolRegistry._templates.pop(WrappedTools, None)
+        with self.assertRaises(ValueError):
+            ToolRegistry.tools(WrappedTools("first"))
+        self.assertNotIn(WrappedTools, ToolRegistry._templates)
+
+    def test_instances_are_not_kept_alive(self):
+        instances = [FakeTools(str(i)) for i in range(5)]
+        for instance in instances:
+            ToolRegistry.tools(instance)
+            ToolRegistry.tools(instance, ['wave'])
+        refs = [weakref.ref(instance) for instance in instances]
+        del instances, instance
+        gc.collect()
+        self.assertEqual([ref() for ref in refs], [None] * 5)
+
+
+if __name__ == '__main__':
+    unittest.main()